@@ -17,7 +17,8 @@ Modify the PARAMETERS section below to customize the design.
 
 import gdsfactory as gf
 import inspect
-from functools import partial
+import numpy as np
+from functools import lru_cache
 from gdsfactory.component import Component
 from gdsfactory.add_pins import add_pins_container
 
@@ -80,25 +81,137 @@ INTERMEDIATE_OFFSET_BOTTOM = 200.0  # Offset from bottom bond pads for routing (
 # COMPONENT TEMPLATES
 # ============================================================================
 
+# Resolve the strip cross-section and Euler bend once; all optical routes reuse them
+_XS = gf.get_cross_section('strip')
+_BEND = gf.get_component('bend_euler', cross_section=_XS)
+
 # Create custom MZI 1x2_2x2 with phase shifter (heater in top arm)
-mzi1x2_2x2_phase_shifter = partial(
-    gf.components.mzi,
-    combiner='mmi2x2',
-    port_e1_combiner='o3',
-    port_e0_combiner='o4',
-    straight_x_top='straight_heater_metal',
-    length_x=MZI_DEFAULT_LENGTH
-)
+def mzi1x2_2x2_phase_shifter(length_x: float = MZI_DEFAULT_LENGTH, **kwargs) -> Component:
+    """MZI with 1x2 splitter, 2x2 MMI combiner and a heater in the top arm."""
+    return gf.components.mzi(
+        combiner='mmi2x2',
+        port_e1_combiner='o3',
+        port_e0_combiner='o4',
+        straight_x_top='straight_heater_metal',
+        length_x=length_x,
+        **kwargs
+    )
+
 
 # Create custom MZI 1x2_1x2 with phase shifter (heater in top arm)
 # This has 1x2 splitter and 1x2 combiner (only one output)
-mzi1x2_1x2_phase_shifter = partial(
-    gf.components.mzi,
-    splitter='mmi1x2',
-    combiner='mmi1x2',
-    straight_x_top='straight_heater_metal',
-    length_x=MZI_DEFAULT_LENGTH
-)
+def mzi1x2_1x2_phase_shifter(length_x: float = MZI_DEFAULT_LENGTH, **kwargs) -> Component:
+    """MZI with 1x2 MMI splitter and combiner and a heater in the top arm."""
+    return gf.components.mzi(
+        splitter='mmi1x2',
+        combiner='mmi1x2',
+        straight_x_top='straight_heater_metal',
+        length_x=length_x,
+        **kwargs
+    )
+
+
+@lru_cache(maxsize=None)
+def _build_mzi_2x2(length_x: float, length_y: float, delta_length: float, xs: str) -> Component:
+    """Build (once) an MZI 1x2_2x2 with phase shifter for the given arm geometry."""
+    return mzi1x2_2x2_phase_shifter(
+        cross_section=xs,
+        length_y=length_y,
+        length_x=length_x,
+        delta_length=delta_length,
+    )
+
+
+@lru_cache(maxsize=None)
+def _build_mzi_1x1(length_x: float, length_y: float, delta_length: float, xs: str) -> Component:
+    """Build (once) an MZI 1x2_1x2 with phase shifter for the given arm geometry."""
+    return mzi1x2_1x2_phase_shifter(
+        cross_section=xs,
+        length_y=length_y,
+        length_x=length_x,
+        delta_length=delta_length,
+    )
+
+
+# Heater port groups: the 4 electrical ports of each group are merged into 1 bond pad
+# Each MZI heater has 2 sections (e1,e3,e6,e8 and e2,e4,e5,e7)
+_MZI_PORT_GROUPS = [(1, 3, 6, 8), (2, 4, 5, 7)]
+
+HEATER_GROUPS = {
+    # Standalone heaters (4 heaters x 2 ends = 8 bond pads)
+    **{f"heater_{h}_{end}": [f"heater_{h}_{side}_e{i}" for i in range(1, 5)]
+       for h in range(1, 5) for end, side in (('left', 'l'), ('right', 'r'))},
+    # Circuit MZI heaters (3 circuits x 2 ends = 6 bond pads)
+    **{f"circuit_{n}_mzi_{grp + 1}": [f"circuit_{n}_mzi_e{i}" for i in ports]
+       for n in range(1, len(N_LOOPS_LIST) + 1) for grp, ports in enumerate(_MZI_PORT_GROUPS)},
+    # Stacked MZI heaters (4 MZIs x 2 ends = 8 bond pads)
+    **{f"stacked_mzi_{n}_{grp + 1}": [f"stacked_mzi_{n}_e{i}" for i in ports]
+       for n in range(1, STACKED_MZI_COUNT + 1) for grp, ports in enumerate(_MZI_PORT_GROUPS)},
+}
+
+
+@lru_cache(maxsize=None)
+def _straight(length: float, cross_section: str = 'strip') -> Component:
+    """Build (once) a straight waveguide; pass lengths rounded to the 1 nm grid."""
+    return gf.components.straight(length=length, cross_section=cross_section)
+
+
+# Short alignment waveguide, shared by every circuit and the chip-level alignment marks
+_ALIGN_WG = _straight(WG_LENGTH)
+
+
+def _electrical_ports(comp) -> list:
+    """Return the electrical ports of a component or reference, in port order."""
+    return [p for p in comp.ports if p.port_type == 'electrical']
+
+
+def _renamed_port(port, name: str):
+    """Return a copy of port with a new name, for batch export with add_ports."""
+    port = port.copy()
+    port.name = name
+    return port
+
+
+def _to_nm(values) -> np.ndarray:
+    """Round micron coordinates onto the 1 nm database grid as int32, for exact sort keys."""
+    return np.rint(np.asarray(values) * 1000).astype(np.int32)
+
+
+def _segment_polygons(starts: np.ndarray, ends: np.ndarray, width: float) -> np.ndarray:
+    """
+    Corners, shape (K, 4, 2), of straight traces of the given width from starts[k] to ends[k], with flat ends.
+
+    Zero-length traces are dropped, so K can be smaller than len(starts).
+    """
+    d = ends - starts
+    length = np.hypot(d[:, 0], d[:, 1])
+    live = length > 0
+    starts, ends, d = starts[live], ends[live], d[live]
+    scale = width / 2 / length[live]
+    normal = np.column_stack([-d[:, 1] * scale, d[:, 0] * scale])
+    return np.stack([starts + normal, ends + normal, ends - normal, starts - normal], axis=1)
+
+
+def _manhattan_rectangles(routes: np.ndarray, width: float) -> np.ndarray:
+    """
+    Corners, shape (K, 4, 2), of the leg rectangles of Manhattan polyline traces routes[n] of the given width.
+
+    Every leg is extended by width/2 into the bends so the corners are filled square,
+    while the first and last points keep flat ends (same outline as an extruded path).
+    Zero-length legs are dropped.
+    """
+    starts, ends = routes[:, :-1], routes[:, 1:]
+    direction = np.sign(ends - starts)  # Unit vector along each axis-aligned leg
+    live = np.any(direction != 0, axis=2)
+    # A leg end is a bend, and gets extended, only if a live leg lies beyond it
+    half = width / 2
+    ext0 = np.where(np.cumsum(live, axis=1) > live, half, 0.0)[..., None]
+    ext1 = np.where(np.cumsum(live[:, ::-1], axis=1)[:, ::-1] > live, half, 0.0)[..., None]
+    a = starts - direction * ext0
+    b = ends + direction * ext1
+    offset = np.abs(direction[..., ::-1]) * half  # Half-width offset across each leg
+    corners = np.stack([a - offset, a + offset, b + offset, b - offset], axis=2)
+    return corners[live]
 
 
 @gf.cell
@@ -117,7 +230,6 @@ def spiral_mzi_circuit(n_loops: int = 6, mzi_length_x: float = 150.0) -> Compone
     c = gf.Component()
 
     # Create sub-components
-    c_strip = gf.components.straight(length=WG_LENGTH, cross_section='strip')
     c_spiral = gf.components.spiral(
         length=0,
         bend='bend_euler',
@@ -126,15 +238,10 @@ def spiral_mzi_circuit(n_loops: int = 6, mzi_length_x: float = 150.0) -> Compone
         spacing=SPIRAL_SPACING,
         n_loops=n_loops
     )
-    c_mzi = mzi1x2_2x2_phase_shifter(
-        cross_section='strip',
-        length_y=0.0,
-        length_x=mzi_length_x,
-        delta_length=0.0,
-    )
+    c_mzi = _build_mzi_2x2(length_x=mzi_length_x, length_y=0.0, delta_length=0.0, xs='strip')
 
     # Add references
-    ref_WG = c << c_strip
+    ref_WG = c << _ALIGN_WG
     ref_spiral = c << c_spiral
     ref_spiral.rotate(SPIRAL_ROTATION).movey(SPIRAL_Y_OFFSET)
     ref_mzi = c << c_mzi
@@ -147,8 +254,8 @@ def spiral_mzi_circuit(n_loops: int = 6, mzi_length_x: float = 150.0) -> Compone
         c,
         port1=ref_spiral.ports["o2"],
         port2=ref_WG.ports["o1"],
-        cross_section='strip',
-        bend='bend_euler'
+        cross_section=_XS,
+        bend=_BEND
     )
 
     # Export optical ports
@@ -157,9 +264,7 @@ def spiral_mzi_circuit(n_loops: int = 6, mzi_length_x: float = 150.0) -> Compone
     c.add_port("o3", port=ref_mzi.ports["o3"])     # MZI output 2
 
     # Export electrical ports from MZI heater
-    for port in ref_mzi.ports:
-        if 'e' in port.name or port.port_type == 'electrical':
-            c.add_port(f"mzi_{port.name}", port=port)
+    c.add_ports(_electrical_ports(ref_mzi), prefix="mzi_")
 
     return c
 
@@ -171,10 +276,14 @@ def spiral_mzi_circuit(n_loops: int = 6, mzi_length_x: float = 150.0) -> Compone
 # Create the main chip component
 c_chip = gf.Component("chip")
 
+# Optical (strip) connections are collected as (port1, port2) pairs while the chip
+# is assembled and routed together in one pass once all components are placed
+strip_routes = []
+
 # Create three short waveguides for alignment at y=0
 waveguides = []
 for i, x_pos in enumerate(WG_POSITIONS):
-    wg = c_chip << gf.components.straight(length=WG_LENGTH, cross_section='strip')
+    wg = c_chip << _ALIGN_WG
     wg.move((x_pos, 0))  # Position at (x_pos, 0)
     waveguides.append(wg)
 
@@ -190,36 +299,20 @@ for i, n_loops in enumerate(N_LOOPS_LIST):
 # Connect waveguide output to next spiral input (chain the circuits)
 for i in range(len(circuits) - 1):
     # Route from waveguide i output (o2) to next circuit's spiral input (o1)
-    gf.routing.route_single(
-        c_chip,
-        port1=waveguides[i].ports["o2"],
-        port2=circuits[i+1].ports["o1"],
-        cross_section='strip',
-        bend='bend_euler'
-    )
+    strip_routes.append((waveguides[i].ports["o2"], circuits[i+1].ports["o1"]))
 
 # Create four additional MZI 1x2_1x2 circuits stacked along x
-# Get MZI dimensions for spacing
-test_mzi = mzi1x2_1x2_phase_shifter(
-    cross_section='strip',
-    length_y=0.0,
-    length_x=MZI_LENGTH_X,
-    delta_length=0.0,
-)
-mzi_width = test_mzi.xmax - test_mzi.xmin
-mzi_height = test_mzi.ymax - test_mzi.ymin
+# Build the MZI cell once: it is measured for spacing and then referenced for every stacked MZI
+mzi_cell = _build_mzi_1x1(length_x=MZI_LENGTH_X, length_y=0.0, delta_length=0.0, xs='strip')
+mzi_width = mzi_cell.xmax - mzi_cell.xmin
+mzi_height = mzi_cell.ymax - mzi_cell.ymin
 
 # Create stacked MZIs with consistent y offset to prevent overlap
 x_spacing = mzi_width + STACKED_MZI_X_SPACING_EXTRA
 y_shift = -(mzi_height / 2 + 5)  # Half height plus 5 um buffer, negative for downward shift
 stacked_mzis = []
 for i in range(STACKED_MZI_COUNT):
-    mzi = c_chip << mzi1x2_1x2_phase_shifter(
-        cross_section='strip',
-        length_y=0.0,
-        length_x=MZI_LENGTH_X,
-        delta_length=0.0,
-    )
+    mzi = c_chip << mzi_cell
     # Position the MZI: stack along x, with consistent y offset for each
     x_pos = STACKED_MZI_X_START + i * x_spacing
     y_pos = STACKED_MZI_Y_START + i * y_shift  # Consistent downward shift
@@ -247,19 +340,13 @@ for i, port in enumerate(ports_to_connect):
     heater.rotate(90)
 
     # Position the heater: place it offset from the port
-    heater.movex(port.x - HEATER_OFFSET_X).movey(port.y + HEATER_OFFSET_Y)
+    heater.move((port.x - HEATER_OFFSET_X, port.y + HEATER_OFFSET_Y))
 
     heaters.append(heater)
 
 # Route from each port to its corresponding heater
 for i, port in enumerate(ports_to_connect):
-    gf.routing.route_single(
-        c_chip,
-        port1=port,
-        port2=heaters[i].ports["o1"],
-        cross_section='strip',
-        bend='bend_euler'
-    )
+    strip_routes.append((port, heaters[i].ports["o1"]))
 
 # Route from vertical heater outputs to stacked MZI inputs
 # Based on x-ordering: leftmost heater to leftmost MZI, etc.
@@ -269,15 +356,7 @@ heater_to_mzi_connections = [
     (heaters[2].ports["o2"], stacked_mzis[2].ports["o1"]),  # heater_3 → stacked_mzi_3
     (heaters[3].ports["o2"], stacked_mzis[3].ports["o1"]),  # heater_4 → stacked_mzi_4
 ]
-
-for heater_port, mzi_port in heater_to_mzi_connections:
-    gf.routing.route_single(
-        c_chip,
-        port1=heater_port,
-        port2=mzi_port,
-        cross_section='strip',
-        bend='bend_euler'
-    )
+strip_routes.extend(heater_to_mzi_connections)
 
 # Export the chain's input and output ports
 c_chip.add_port("input", port=heaters[0].ports["o1"])  # Input through first heater (changed from o2 to o1)
@@ -293,21 +372,15 @@ for i, heater in enumerate(heaters):
 # Export electrical ports for all standalone heaters
 for i, heater in enumerate(heaters):
     # Each heater has electrical ports for the metal contacts
-    for port in heater.ports:
-        if 'e' in port.name:  # Electrical ports
-            c_chip.add_port(f"heater_{i+1}_{port.name}", port=port)
+    c_chip.add_ports(_electrical_ports(heater), prefix=f"heater_{i+1}_")
 
 # Export electrical ports from MZI heaters in each circuit
 for i, circuit in enumerate(circuits):
-    for port in circuit.ports:
-        if 'mzi_e' in port.name:  # MZI heater electrical ports
-            c_chip.add_port(f"circuit_{i+1}_{port.name}", port=port)
+    c_chip.add_ports(_electrical_ports(circuit), prefix=f"circuit_{i+1}_")  # MZI heater electrical ports
 
 # Export electrical ports from stacked MZIs
 for i, mzi in enumerate(stacked_mzis):
-    for port in mzi.ports:
-        if port.port_type == 'electrical':
-            c_chip.add_port(f"stacked_mzi_{i+1}_{port.name}", port=port)
+    c_chip.add_ports(_electrical_ports(mzi), prefix=f"stacked_mzi_{i+1}_")
 
 # Extend stacked MZI o2 ports to target X position and add fan-in
 # First, extend each stacked MZI o2 port using straight waveguides
@@ -315,16 +388,13 @@ extended_ports = []
 for i, mzi in enumerate(stacked_mzis):
     o2_port = mzi.ports['o2']
 
-    # Calculate the length needed to reach target X
+    # Calculate the length needed to reach target X (on the 1 nm grid)
     current_x = o2_port.x
-    extension_length = FANIN_TARGET_X - current_x
+    extension_length = round(FANIN_TARGET_X - current_x, 3)
 
     if extension_length > 0:
         # Create a straight waveguide to extend to target X
-        extension_wg = c_chip << gf.components.straight(
-            length=extension_length,
-            cross_section='strip'
-        )
+        extension_wg = c_chip << _straight(extension_length)
         extension_wg.connect('o1', o2_port)
         extended_ports.append(extension_wg.ports['o2'])
     else:
@@ -333,11 +403,11 @@ for i, mzi in enumerate(stacked_mzis):
 
 # Now create the fan-in starting at target X
 # Get the y positions of the extended ports
-y_positions = [port.y for port in extended_ports]
+y_positions = np.array([port.y for port in extended_ports])
 
-# Calculate the center y position for the fan-in output
-y_center = sum(y_positions) / len(y_positions)
-y_start_output = y_center - (len(extended_ports) - 1) * FANIN_OUTPUT_SPACING / 2
+# Calculate the center y position and half span of the fan-in output
+y_center = y_positions.mean()
+fanin_half_span = (len(extended_ports) - 1) * FANIN_OUTPUT_SPACING / 2
 
 # Create input waveguides for the fan-in
 fanin_input_wgs = []
@@ -354,19 +424,17 @@ mmi4x2.movex(FANIN_TARGET_X + FANIN_INPUT_LENGTH + FANIN_MMI_OFFSET_X)
 
 # Calculate the target y positions for fan-in outputs (FLIPPED order)
 # These will be the positions where the S-bend outputs should end up
-fanin_output_y_positions = []
-for i in range(len(extended_ports)):
-    # Reversed order: start from highest y and go down
-    y = y_start_output + (len(extended_ports) - 1 - i) * FANIN_OUTPUT_SPACING
-    fanin_output_y_positions.append(y)
+# Reversed order: start from highest y and go down
+fanin_output_y_positions = np.linspace(
+    y_center + fanin_half_span, y_center - fanin_half_span, len(extended_ports)
+)
 
 # Center the MMI vertically with the calculated fan-in output positions
-fanin_y_center = sum(fanin_output_y_positions) / len(fanin_output_y_positions)
+fanin_y_center = fanin_output_y_positions.mean()
 
 # Get MMI input port y positions to calculate its center
 mmi_input_ports = [mmi4x2.ports[f'o{i+1}'] for i in range(4)]
-mmi_input_y_positions = [p.y for p in mmi_input_ports]
-mmi_y_center = sum(mmi_input_y_positions) / len(mmi_input_y_positions)
+mmi_y_center = np.mean([p.y for p in mmi_input_ports])
 
 # Move MMI to align centers
 mmi4x2.movey(fanin_y_center - mmi_y_center)
@@ -378,7 +446,7 @@ fanin_routes = gf.routing.route_bundle_sbend(
     component=c_chip,
     ports1=[wg.ports['o2'] for wg in fanin_input_wgs],
     ports2=[mmi4x2.ports[f'o{i+1}'] for i in range(3, -1, -1)],  # Reversed: o4, o3, o2, o1
-    cross_section='strip'
+    cross_section=_XS
 )
 
 # Export optical ports from stacked MZIs (o1 ports only, since o2 are now connected)
@@ -389,20 +457,20 @@ for i, mzi in enumerate(stacked_mzis):
 # Get MMI output ports directly
 mmi_output_ports = [mmi4x2.ports['o5'], mmi4x2.ports['o6']]
 
-# Calculate center y position for fan-out outputs
-mmi_output_y_positions = [p.y for p in mmi_output_ports]
-fanout_y_center = sum(mmi_output_y_positions) / len(mmi_output_y_positions)
-fanout_total_output_span = (len(mmi_output_ports) - 1) * FANOUT_OUTPUT_SPACING
-fanout_y_start_output = fanout_y_center - fanout_total_output_span / 2
+# Calculate y positions for fan-out outputs, centered on the MMI outputs
+# REVERSED order: start from highest y and go down to match MMI output order
+fanout_y_center = np.mean([p.y for p in mmi_output_ports])
+fanout_half_span = (len(mmi_output_ports) - 1) * FANOUT_OUTPUT_SPACING / 2
+fanout_output_y_positions = np.linspace(
+    fanout_y_center + fanout_half_span, fanout_y_center - fanout_half_span, len(mmi_output_ports)
+)
 
 # Create output waveguides for the fan-out
-# REVERSED order: start from highest y and go down to match MMI output order
 fanout_output_wgs = []
-for i in range(len(mmi_output_ports)):
+for y in fanout_output_y_positions:
     wg = c_chip << gf.components.straight(length=FANOUT_OUTPUT_LENGTH, cross_section='strip')
-    wg.movex(mmi4x2.ports['o5'].x + FANOUT_LENGTH_X)  # Position after fan-out transition
-    # Reversed: highest y first (i=0 gets highest y position)
-    wg.movey(fanout_y_start_output + (len(mmi_output_ports) - 1 - i) * FANOUT_OUTPUT_SPACING)
+    # Position after fan-out transition, highest y first
+    wg.move((mmi4x2.ports['o5'].x + FANOUT_LENGTH_X, y))
     fanout_output_wgs.append(wg)
 
 # Create the fan-out using S-bend routing (max 20 um along x)
@@ -410,7 +478,7 @@ fanout_routes = gf.routing.route_bundle_sbend(
     component=c_chip,
     ports1=mmi_output_ports,
     ports2=[wg.ports['o1'] for wg in fanout_output_wgs],
-    cross_section='strip'
+    cross_section=_XS
 )
 
 # Export the fan-out output ports
@@ -430,71 +498,52 @@ gc_array = c_chip << gf.components.grating_coupler_array(
 # We need to rotate it so ports face -x (180 degrees)
 # Rotation from 90° to 180° requires +90° rotation
 gc_array.rotate(90)
-gc_array.movex(GC_ARRAY_X)
-# Move the grating array along +y by one pitch
-gc_array.movey(GC_ARRAY_Y_OFFSET)
+# Move the grating array to GC_ARRAY_X, shifted along +y by one pitch
+gc_array.move((GC_ARRAY_X, GC_ARRAY_Y_OFFSET))
 
-# Export grating coupler ports
-for i in range(GC_COUNT):
-    c_chip.add_port(f"gc_{i}", port=gc_array.ports[f'o{i}'])
+# Export grating coupler ports (o0..o7 as gc_0..gc_7) in one add_ports call
+c_chip.add_ports([_renamed_port(gc_array.ports[f'o{i}'], f"gc_{i}") for i in range(GC_COUNT)])
 
 # Route fan-out outputs to grating couplers
 # After moving GC array by +127 um, the new positions are:
 # gc_4: y = 190.5
 # gc_5: y = 317.5
 # CORRECTED: Fan-out output 0 (higher, y=239.75) → gc_5 (y=317.5), Fan-out output 1 (lower, y=234.75) → gc_4 (y=190.5)
-gf.routing.route_single(
-    c_chip,
-    port1=fanout_output_wgs[0].ports['o2'],  # Higher fan-out output (y=239.75)
-    port2=gc_array.ports['o5'],  # gc_5 (y=317.5)
-    cross_section='strip',
-    bend='bend_euler'
-)
-
-gf.routing.route_single(
-    c_chip,
-    port1=fanout_output_wgs[1].ports['o2'],  # Lower fan-out output (y=234.75)
-    port2=gc_array.ports['o4'],  # gc_4 (y=190.5)
-    cross_section='strip',
-    bend='bend_euler'
-)
+strip_routes.extend([
+    (fanout_output_wgs[0].ports['o2'], gc_array.ports['o5']),  # Higher fan-out output (y=239.75) → gc_5 (y=317.5)
+    (fanout_output_wgs[1].ports['o2'], gc_array.ports['o4']),  # Lower fan-out output (y=234.75) → gc_4 (y=190.5)
+])
 
 # Route GC3 to the third MZI-spiral circuit's o2 port (the unused MZI output)
-gf.routing.route_single(
-    c_chip,
-    port1=gc_array.ports['o3'],  # gc_3
-    port2=circuits[2].ports['o2'],  # Third MZI-spiral circuit o2 (unused output)
-    cross_section='strip',
-    bend='bend_euler'
-)
-
-# Add loopback between gc_0 and gc_1
-gf.routing.route_single(
-    c_chip,
-    port1=gc_array.ports['o0'],  # gc_0
-    port2=gc_array.ports['o1'],  # gc_1
-    cross_section='strip',
-    bend='bend_euler'
-)
-
-# Add loopback between gc_6 and gc_7
-gf.routing.route_single(
-    c_chip,
-    port1=gc_array.ports['o6'],  # gc_6
-    port2=gc_array.ports['o7'],  # gc_7
-    cross_section='strip',
-    bend='bend_euler'
-)
+strip_routes.append((gc_array.ports['o3'], circuits[2].ports['o2']))
+
+# Add loopbacks between gc_0 and gc_1, and between gc_6 and gc_7
+strip_routes.extend([
+    (gc_array.ports['o0'], gc_array.ports['o1']),
+    (gc_array.ports['o6'], gc_array.ports['o7']),
+])
+
+# Route all collected optical connections with Euler bends
+# These pairs do not form parallel buses, so each one is routed individually:
+# route_bundle would force them onto a shared trunk and change the optical path lengths
+# Routing stays serial: every route inserts cells into c_chip, which is not thread-safe
+for port1, port2 in strip_routes:
+    gf.routing.route_single(
+        c_chip,
+        port1=port1,
+        port2=port2,
+        cross_section=_XS,
+        bend=_BEND
+    )
 
 # ============================================================================
 # CREATE BOND PADS FOR ELECTRICAL ROUTING
 # ============================================================================
 
-# Get current chip extent
-chip_xmin = c_chip.xmin
-chip_xmax = c_chip.xmax
-chip_ymin = c_chip.ymin
-chip_ymax = c_chip.ymax
+# Get current chip extent (one bounding box computation)
+chip_bbox = c_chip.dbbox()
+chip_xmin, chip_xmax = chip_bbox.left, chip_bbox.right
+chip_ymin, chip_ymax = chip_bbox.bottom, chip_bbox.top
 
 print(f"\n=== Chip Extent (before bond pads) ===")
 print(f"X: [{chip_xmin:.1f}, {chip_xmax:.1f}] um")
@@ -508,105 +557,78 @@ print(f"\n=== Bond Pad Edge Positions (with {EDGE_BUFFER} um buffer) ===")
 print(f"LEFT edge x: {left_edge_x:.1f} um")
 print(f"BOTTOM edge y: {bottom_edge_y:.1f} um")
 
-# Group heater ports by heater and end (left/right)
-# Each heater has 2 ends, each end has 4 ports that should be merged into 1 bond pad
-
-heater_groups = {
-    # Standalone heaters (4 heaters x 2 ends = 8 bond pads)
-    'heater_1_left': ['heater_1_l_e1', 'heater_1_l_e2', 'heater_1_l_e3', 'heater_1_l_e4'],
-    'heater_1_right': ['heater_1_r_e1', 'heater_1_r_e2', 'heater_1_r_e3', 'heater_1_r_e4'],
-    'heater_2_left': ['heater_2_l_e1', 'heater_2_l_e2', 'heater_2_l_e3', 'heater_2_l_e4'],
-    'heater_2_right': ['heater_2_r_e1', 'heater_2_r_e2', 'heater_2_r_e3', 'heater_2_r_e4'],
-    'heater_3_left': ['heater_3_l_e1', 'heater_3_l_e2', 'heater_3_l_e3', 'heater_3_l_e4'],
-    'heater_3_right': ['heater_3_r_e1', 'heater_3_r_e2', 'heater_3_r_e3', 'heater_3_r_e4'],
-    'heater_4_left': ['heater_4_l_e1', 'heater_4_l_e2', 'heater_4_l_e3', 'heater_4_l_e4'],
-    'heater_4_right': ['heater_4_r_e1', 'heater_4_r_e2', 'heater_4_r_e3', 'heater_4_r_e4'],
-
-    # Circuit MZI heaters (3 circuits x 2 ends = 6 bond pads)
-    # Each MZI has 2 heater sections (e1,e3,e6,e8 and e2,e4,e5,e7)
-    'circuit_1_mzi_1': ['circuit_1_mzi_e1', 'circuit_1_mzi_e3', 'circuit_1_mzi_e6', 'circuit_1_mzi_e8'],
-    'circuit_1_mzi_2': ['circuit_1_mzi_e2', 'circuit_1_mzi_e4', 'circuit_1_mzi_e5', 'circuit_1_mzi_e7'],
-    'circuit_2_mzi_1': ['circuit_2_mzi_e1', 'circuit_2_mzi_e3', 'circuit_2_mzi_e6', 'circuit_2_mzi_e8'],
-    'circuit_2_mzi_2': ['circuit_2_mzi_e2', 'circuit_2_mzi_e4', 'circuit_2_mzi_e5', 'circuit_2_mzi_e7'],
-    'circuit_3_mzi_1': ['circuit_3_mzi_e1', 'circuit_3_mzi_e3', 'circuit_3_mzi_e6', 'circuit_3_mzi_e8'],
-    'circuit_3_mzi_2': ['circuit_3_mzi_e2', 'circuit_3_mzi_e4', 'circuit_3_mzi_e5', 'circuit_3_mzi_e7'],
-
-    # Stacked MZI heaters (4 MZIs x 2 ends = 8 bond pads)
-    'stacked_mzi_1_1': ['stacked_mzi_1_e1', 'stacked_mzi_1_e3', 'stacked_mzi_1_e6', 'stacked_mzi_1_e8'],
-    'stacked_mzi_1_2': ['stacked_mzi_1_e2', 'stacked_mzi_1_e4', 'stacked_mzi_1_e5', 'stacked_mzi_1_e7'],
-    'stacked_mzi_2_1': ['stacked_mzi_2_e1', 'stacked_mzi_2_e3', 'stacked_mzi_2_e6', 'stacked_mzi_2_e8'],
-    'stacked_mzi_2_2': ['stacked_mzi_2_e2', 'stacked_mzi_2_e4', 'stacked_mzi_2_e5', 'stacked_mzi_2_e7'],
-    'stacked_mzi_3_1': ['stacked_mzi_3_e1', 'stacked_mzi_3_e3', 'stacked_mzi_3_e6', 'stacked_mzi_3_e8'],
-    'stacked_mzi_3_2': ['stacked_mzi_3_e2', 'stacked_mzi_3_e4', 'stacked_mzi_3_e5', 'stacked_mzi_3_e7'],
-    'stacked_mzi_4_1': ['stacked_mzi_4_e1', 'stacked_mzi_4_e3', 'stacked_mzi_4_e6', 'stacked_mzi_4_e8'],
-    'stacked_mzi_4_2': ['stacked_mzi_4_e2', 'stacked_mzi_4_e4', 'stacked_mzi_4_e5', 'stacked_mzi_4_e7'],
-}
-
-# Calculate average position for each group and determine which edge to route to
-bond_pad_info = []
-for group_name, port_names in heater_groups.items():
-    # Get the ports
-    ports = [c_chip.ports[name] for name in port_names if name in c_chip.ports]
-    if not ports:
-        continue
-
-    # Calculate average position
-    avg_x = sum(p.x for p in ports) / len(ports)
-    avg_y = sum(p.y for p in ports) / len(ports)
-
-    # Decide which edge: LEFT if x < 100, BOTTOM otherwise
-    edge = 'LEFT' if avg_x < 100 else 'BOTTOM'
-
-    bond_pad_info.append({
-        'name': group_name,
-        'ports': ports,
-        'avg_x': avg_x,
-        'avg_y': avg_y,
-        'edge': edge
-    })
-
-# Sort by position
-left_pads = sorted([p for p in bond_pad_info if p['edge'] == 'LEFT'], key=lambda p: p['avg_y'])
-bottom_pads = sorted([p for p in bond_pad_info if p['edge'] == 'BOTTOM'], key=lambda p: p['avg_x'])
+# Bond pad groups are stored as parallel arrays indexed by group:
+# group_names, group_ports, centroids (avg x/y), is_left (edge) and bondpad_names
+# Get the ports of each group, skipping groups without any ports on the chip
+# Ports are indexed by name once: name lookups on c_chip.ports scan every port
+chip_ports = {port.name: port for port in c_chip.ports}
+group_names = []
+group_ports = []
+for group_name, port_names in HEATER_GROUPS.items():
+    ports = [p for p in (chip_ports.get(name) for name in port_names) if p is not None]
+    if ports:
+        group_names.append(group_name)
+        group_ports.append(ports)
+
+# Calculate the average position of all groups at once
+# All port coordinates are stacked into one (N, 2) array and summed per group
+xy = np.array([(p.x, p.y) for ports in group_ports for p in ports])
+group_offsets = np.cumsum([0] + [len(ports) for ports in group_ports])
+centroids = np.add.reduceat(xy, group_offsets[:-1]) / np.diff(group_offsets)[:, None]
+# Group index of every row of xy, so per-port data can be gathered from per-group arrays
+port_group = np.repeat(np.arange(len(group_ports)), np.diff(group_offsets))
+# Orderings compare positions on the 1 nm grid, so float noise cannot reorder pads or channels
+centroids_nm = _to_nm(centroids)
+
+# Decide which edge each group routes to: LEFT if x < 100, BOTTOM otherwise
+is_left = centroids[:, 0] < 100
+bondpad_names = [f"bondpad_{group_name}" for group_name in group_names]
+
+# Sort by position: LEFT pads by Y, BOTTOM pads by X (stable, like sorted())
+# left_pads / bottom_pads hold group indices in pad order
+left_idx = np.flatnonzero(is_left)
+bottom_idx = np.flatnonzero(~is_left)
+left_pads = left_idx[np.argsort(centroids_nm[left_idx, 1], kind='stable')]
+bottom_pads = bottom_idx[np.argsort(centroids_nm[bottom_idx, 0], kind='stable')]
 
 print(f"\n=== Bond Pad Assignment ===")
-print(f"Total heater groups: {len(bond_pad_info)}")
+print(f"Total heater groups: {len(group_names)}")
 print(f"LEFT edge bond pads: {len(left_pads)}")
 print(f"BOTTOM edge bond pads: {len(bottom_pads)}")
 
 # Create bond pads along LEFT edge
-for i, pad_info in enumerate(left_pads):
+# Bond pad port centers are kept as arrays indexed like left_pads, for the routing below
+left_pad_y = LEFT_PAD_START_Y + np.arange(len(left_pads)) * PAD_PITCH
+left_bondpad_x = np.full(len(left_pads), left_edge_x + PAD_SIZE/2)
+left_channel_y = left_pad_y + PAD_SIZE/2
+for i, g in enumerate(left_pads):
     # Create a rectangular bond pad
     pad = c_chip << gf.components.rectangle(size=(PAD_SIZE, PAD_SIZE), layer='M3')
-    pad_y = LEFT_PAD_START_Y + i * PAD_PITCH
-    pad.move((left_edge_x, pad_y))
+    pad.move((left_edge_x, left_pad_y[i]))
 
     # Add port to the bond pad for routing
-    c_chip.add_port(f"bondpad_{pad_info['name']}",
-                    center=(left_edge_x + PAD_SIZE/2, pad_y + PAD_SIZE/2),
+    c_chip.add_port(bondpad_names[g],
+                    center=(left_bondpad_x[i], left_channel_y[i]),
                     width=PAD_PORT_WIDTH, orientation=0, layer='M3', port_type='electrical')
 
-    # Store mapping for later routing
-    pad_info['bondpad_name'] = f"bondpad_{pad_info['name']}"
-
 print(f"Created {len(left_pads)} bond pads on LEFT edge")
 print(f"  Y range: [{LEFT_PAD_START_Y:.1f}, {LEFT_PAD_START_Y + (len(left_pads)-1)*PAD_PITCH:.1f}]")
 
 # Create bond pads along BOTTOM edge
-for i, pad_info in enumerate(bottom_pads):
+# Bond pad port centers are kept as arrays indexed like bottom_pads, for the routing below
+bottom_pad_x = BOTTOM_PAD_START_X + np.arange(len(bottom_pads)) * PAD_PITCH
+bottom_channel_x = bottom_pad_x + PAD_SIZE/2
+bottom_bondpad_y = np.full(len(bottom_pads), bottom_edge_y + PAD_SIZE/2)
+for i, g in enumerate(bottom_pads):
     # Create a rectangular bond pad
     pad = c_chip << gf.components.rectangle(size=(PAD_SIZE, PAD_SIZE), layer='M3')
-    pad_x = BOTTOM_PAD_START_X + i * PAD_PITCH
-    pad.move((pad_x, bottom_edge_y))
+    pad.move((bottom_pad_x[i], bottom_edge_y))
 
     # Add port to the bond pad for routing
-    c_chip.add_port(f"bondpad_{pad_info['name']}",
-                    center=(pad_x + PAD_SIZE/2, bottom_edge_y + PAD_SIZE/2),
+    c_chip.add_port(bondpad_names[g],
+                    center=(bottom_channel_x[i], bottom_bondpad_y[i]),
                     width=PAD_PORT_WIDTH, orientation=90, layer='M3', port_type='electrical')
 
-    # Store mapping for later routing
-    pad_info['bondpad_name'] = f"bondpad_{pad_info['name']}"
-
 print(f"Created {len(bottom_pads)} bond pads on BOTTOM edge")
 print(f"  X range: [{BOTTOM_PAD_START_X:.1f}, {BOTTOM_PAD_START_X + (len(bottom_pads)-1)*PAD_PITCH:.1f}]")
 
@@ -616,9 +638,15 @@ print(f"  X range: [{BOTTOM_PAD_START_X:.1f}, {BOTTOM_PAD_START_X + (len(bottom_
 
 print(f"\n=== Electrical Routing ===")
 
+# Loop invariant for trace emission: resolve the metal layer once
+metal_layer = gf.get_layer(METAL_LAYER)
+
+# The ports of each heater group face in all four directions and share a single bond pad,
+# so they are fanned in to a merge point first (route_bundle would collide on the pad port)
+
 # Route LEFT edge pads
 # Strategy: Maintain Y-order to avoid crossings and overlaps
-# 1. Collect all merge points and sort by Y
+# 1. Collect all merge points in Y order (the pad order)
 # 2. Assign each a unique Y-channel at intermediate X (spaced by metal_width)
 # 3. Route: merge -> intermediate_x at unique Y -> bond pad's Y -> bond pad
 print(f"Routing {len(left_pads)} groups to LEFT edge...")
@@ -628,71 +656,61 @@ print(f"Routing {len(left_pads)} groups to LEFT edge...")
 intermediate_x_left = left_edge_x + INTERMEDIATE_OFFSET_LEFT
 
 # First pass: calculate all merge points and assign unique Y channels
-left_routing_info = []
-for i, pad_info in enumerate(left_pads):
-    ports = pad_info['ports']
-    bondpad_name = pad_info['bondpad_name']
-    bondpad_port = c_chip.ports[bondpad_name]
-
-    # Calculate merge point at average position
-    merge_point_x = sum(p.x for p in ports) / len(ports)
-    merge_point_y = sum(p.y for p in ports) / len(ports)
-
-    left_routing_info.append({
-        'pad_info': pad_info,
-        'ports': ports,
-        'bondpad_port': bondpad_port,
-        'merge_x': merge_point_x,
-        'merge_y': merge_point_y,
-        'channel_y': bondpad_port.y,
-        'sort_key': merge_point_y  # Sort by merge point Y
-    })
-
-# Sort by Y position to assign non-overlapping channels
-left_routing_info.sort(key=lambda x: x['sort_key'])
-
-# Assign unique Y positions at intermediate_x (spaced by metal_width + gap)
+# Routing data is kept as parallel arrays indexed like left_pads
+# Merge points are the group average positions, already computed for all groups in centroids
+left_merge_x = centroids[left_pads, 0]
+left_merge_y = centroids[left_pads, 1]
+# Bond pad port centers (left_channel_y, left_bondpad_x) were computed when the pads were created
+
+# Non-overlapping channels are assigned in Y order (ties broken by bond pad Y)
+# left_pads is already in that order: it was stably sorted on the same merge Y key, and pad Y grows with the index
+
+# Assign unique Y positions at intermediate_x (spaced by metal_width + gap), in pad order
 channel_spacing = METAL_WIDTH + CHANNEL_SPACING_GAP
-for idx, info in enumerate(left_routing_info):
-    # Assign Y position at intermediate X, evenly spaced
-    info['intermediate_y'] = info['merge_y'] + idx * channel_spacing - (len(left_routing_info) - 1) * channel_spacing / 2
+n_left = len(left_pads)
+left_intermediate_y = left_merge_y + np.arange(n_left) * channel_spacing - (n_left - 1) * channel_spacing / 2
+
+# Build the Manhattan route vertices of all groups at once, shape (n_left, 5, 2), in pad order
+# Path: merge -> (merge_x, intermediate_y) -> (intermediate_x, intermediate_y) -> (intermediate_x, channel_y) -> bond pad
+left_intermediate_x = np.full(n_left, intermediate_x_left)
+left_routes = np.stack([
+    np.column_stack([left_merge_x, left_merge_y]),                # Start at merge point
+    np.column_stack([left_merge_x, left_intermediate_y]),         # Go VERTICAL to intermediate Y level
+    np.column_stack([left_intermediate_x, left_intermediate_y]),  # Go HORIZONTAL to intermediate X
+    np.column_stack([left_intermediate_x, left_channel_y]),       # Go VERTICAL to bond pad's Y channel
+    np.column_stack([left_bondpad_x, left_channel_y]),            # Go HORIZONTAL to bond pad
+], axis=1)
 
 # Second pass: do the actual routing
-for info in left_routing_info:
-    ports = info['ports']
-    merge_point_x = info['merge_x']
-    merge_point_y = info['merge_y']
-    intermediate_y = info['intermediate_y']
-    channel_y = info['channel_y']
-    bondpad_port = info['bondpad_port']
-
-    # Step 1: Route each port to merge point (short local connections)
-    for port in ports:
-        points = [
-            (port.x, port.y),
-            (merge_point_x, merge_point_y)
-        ]
-        path = gf.Path(points)
-        trace = c_chip << path.extrude(width=METAL_WIDTH, layer=METAL_LAYER)
-
-    # Step 2: Route from merge point to bond pad with Manhattan routing
-    # Path: merge -> (merge_x, intermediate_y) -> (intermediate_x, intermediate_y) -> (intermediate_x, channel_y) -> bond pad
-    route_points = [
-        (merge_point_x, merge_point_y),        # Start at merge point
-        (merge_point_x, intermediate_y),        # Go VERTICAL to intermediate Y level
-        (intermediate_x_left, intermediate_y),  # Go HORIZONTAL to intermediate X
-        (intermediate_x_left, channel_y),       # Go VERTICAL to bond pad's Y channel
-        (bondpad_port.x, channel_y)             # Go HORIZONTAL to bond pad
-    ]
-
-    path = gf.Path(route_points)
-    trace = c_chip << path.extrude(width=METAL_WIDTH, layer=METAL_LAYER)
+# Trace rectangles are written into one presized (n_rects, 4, 2) buffer: at most a wire per port and 4 legs per route
+left_wires = is_left[port_group]
+left_rects = np.empty((np.count_nonzero(left_wires) + 4 * len(left_pads), 4, 2))
+
+# Step 1: Route each port to its merge point (short local connections)
+# The wires of all LEFT groups are built at once from the flattened port buffer and their group centroids
+# Zero-length wires (a port on its merge point) are dropped, so k counts the rows actually written
+wires = _segment_polygons(xy[left_wires], centroids[port_group[left_wires]], METAL_WIDTH)
+k = len(wires)
+left_rects[:k] = wires
+
+# Step 2: Route from each merge point to its bond pad with Manhattan routing
+# The legs of all routes are built at once from the route vertex array
+legs = _manhattan_rectangles(left_routes, METAL_WIDTH)
+left_rects[k:k + len(legs)] = legs
+k += len(legs)
+
+# Add all LEFT traces as plain polygons on the metal layer of a child cell, referenced once into the chip
+# (keeps the chip's top cell small for KLayout and downstream tools)
+left_metal = gf.Component("left_metal")
+for polygon in left_rects[:k]:
+    left_metal.add_polygon(polygon, layer=metal_layer)
+c_chip << left_metal
 
 print(f"  ✓ Routed {len(left_pads)} groups to LEFT edge")
 
 # Route BOTTOM edge pads
 # Strategy: Maintain X-order to avoid crossings and overlaps
-# 1. Collect all merge points and sort by X
+# 1. Collect all merge points in X order (the pad order)
 # 2. Assign each a unique X-channel at intermediate Y (spaced by metal_width)
 # 3. Route: merge -> intermediate_y at unique X -> bond pad's X -> bond pad
 print(f"Routing {len(bottom_pads)} groups to BOTTOM edge...")
@@ -702,65 +720,54 @@ print(f"Routing {len(bottom_pads)} groups to BOTTOM edge...")
 intermediate_y_bottom = bottom_edge_y + INTERMEDIATE_OFFSET_BOTTOM
 
 # First pass: calculate all merge points and assign unique X channels
-bottom_routing_info = []
-for i, pad_info in enumerate(bottom_pads):
-    ports = pad_info['ports']
-    bondpad_name = pad_info['bondpad_name']
-    bondpad_port = c_chip.ports[bondpad_name]
-
-    # Calculate merge point at average position
-    merge_point_x = sum(p.x for p in ports) / len(ports)
-    merge_point_y = sum(p.y for p in ports) / len(ports)
-
-    bottom_routing_info.append({
-        'pad_info': pad_info,
-        'ports': ports,
-        'bondpad_port': bondpad_port,
-        'merge_x': merge_point_x,
-        'merge_y': merge_point_y,
-        'channel_x': bondpad_port.x,
-        'sort_key': merge_point_x  # Sort by merge point X
-    })
-
-# Sort by X position to assign non-overlapping channels
-bottom_routing_info.sort(key=lambda x: x['sort_key'])
-
-# Assign unique X positions at intermediate_y (spaced by metal_width + gap)
+# Routing data is kept as parallel arrays indexed like bottom_pads
+# Merge points are the group average positions, already computed for all groups in centroids
+bottom_merge_x = centroids[bottom_pads, 0]
+bottom_merge_y = centroids[bottom_pads, 1]
+# Bond pad port centers (bottom_channel_x, bottom_bondpad_y) were computed when the pads were created
+
+# Non-overlapping channels are assigned in X order (ties broken by bond pad X)
+# bottom_pads is already in that order: it was stably sorted on the same merge X key, and pad X grows with the index
+
+# Assign unique X positions at intermediate_y (spaced by metal_width + gap), in pad order
 channel_spacing = METAL_WIDTH + CHANNEL_SPACING_GAP
-for idx, info in enumerate(bottom_routing_info):
-    # Assign X position at intermediate Y, evenly spaced
-    info['intermediate_x'] = info['merge_x'] + idx * channel_spacing - (len(bottom_routing_info) - 1) * channel_spacing / 2
+n_bottom = len(bottom_pads)
+bottom_intermediate_x = bottom_merge_x + np.arange(n_bottom) * channel_spacing - (n_bottom - 1) * channel_spacing / 2
+
+# Build the Manhattan route vertices of all groups at once, shape (n_bottom, 5, 2), in pad order
+# Path: merge -> (intermediate_x, merge_y) -> (intermediate_x, intermediate_y) -> (channel_x, intermediate_y) -> bond pad
+bottom_intermediate_y = np.full(n_bottom, intermediate_y_bottom)
+bottom_routes = np.stack([
+    np.column_stack([bottom_merge_x, bottom_merge_y]),                # Start at merge point
+    np.column_stack([bottom_intermediate_x, bottom_merge_y]),         # Go HORIZONTAL to intermediate X level
+    np.column_stack([bottom_intermediate_x, bottom_intermediate_y]),  # Go VERTICAL to intermediate Y
+    np.column_stack([bottom_channel_x, bottom_intermediate_y]),       # Go HORIZONTAL to bond pad's X channel
+    np.column_stack([bottom_channel_x, bottom_bondpad_y]),            # Go VERTICAL to bond pad
+], axis=1)
 
 # Second pass: do the actual routing
-for info in bottom_routing_info:
-    ports = info['ports']
-    merge_point_x = info['merge_x']
-    merge_point_y = info['merge_y']
-    intermediate_x = info['intermediate_x']
-    channel_x = info['channel_x']
-    bondpad_port = info['bondpad_port']
-
-    # Step 1: Route each port to merge point (short local connections)
-    for port in ports:
-        points = [
-            (port.x, port.y),
-            (merge_point_x, merge_point_y)
-        ]
-        path = gf.Path(points)
-        trace = c_chip << path.extrude(width=METAL_WIDTH, layer=METAL_LAYER)
-
-    # Step 2: Route from merge point to bond pad with Manhattan routing
-    # Path: merge -> (intermediate_x, merge_y) -> (intermediate_x, intermediate_y) -> (channel_x, intermediate_y) -> bond pad
-    route_points = [
-        (merge_point_x, merge_point_y),         # Start at merge point
-        (intermediate_x, merge_point_y),        # Go HORIZONTAL to intermediate X level
-        (intermediate_x, intermediate_y_bottom), # Go VERTICAL to intermediate Y
-        (channel_x, intermediate_y_bottom),     # Go HORIZONTAL to bond pad's X channel
-        (channel_x, bondpad_port.y)             # Go VERTICAL to bond pad
-    ]
-
-    path = gf.Path(route_points)
-    trace = c_chip << path.extrude(width=METAL_WIDTH, layer=METAL_LAYER)
+# Trace rectangles are written into one presized (n_rects, 4, 2) buffer: at most a wire per port and 4 legs per route
+bottom_wires = ~is_left[port_group]
+bottom_rects = np.empty((np.count_nonzero(bottom_wires) + 4 * len(bottom_pads), 4, 2))
+
+# Step 1: Route each port to its merge point (short local connections)
+# The wires of all BOTTOM groups are built at once from the flattened port buffer and their group centroids
+# k counts the wires actually written
+wires = _segment_polygons(xy[bottom_wires], centroids[port_group[bottom_wires]], METAL_WIDTH)
+k = len(wires)
+bottom_rects[:k] = wires
+
+# Step 2: Route from each merge point to its bond pad with Manhattan routing
+# The legs of all routes are built at once from the route vertex array
+legs = _manhattan_rectangles(bottom_routes, METAL_WIDTH)
+bottom_rects[k:k + len(legs)] = legs
+k += len(legs)
+
+# Add all BOTTOM traces to their own child cell as well
+bottom_metal = gf.Component("bottom_metal")
+for polygon in bottom_rects[:k]:
+    bottom_metal.add_polygon(polygon, layer=metal_layer)
+c_chip << bottom_metal
 
 print(f"  ✓ Routed {len(bottom_pads)} groups to BOTTOM edge")
 print(f"\n✓ Electrical routing complete!")
@@ -778,7 +785,8 @@ c_chip.pprint_ports()
 
 # Option 2: Just draw port markers on their layers (without text labels)
 # c_chip.draw_ports()
-c_chip.write_gds("test.gds")
+# The viewer only renders geometry, so skip the per-cell port/settings metadata (about half the file size)
+c_chip.write_gds("test.gds", with_metadata=False)
 
 # Show in KLayout
 # c_chip_with_pins.show()
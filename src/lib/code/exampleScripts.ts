@@ -24,11 +24,11 @@ export const EXAMPLE_SCRIPTS: ExampleScript[] = [
 		id: "tunable-optical-processor",
 		name: "Tunable Optical Processor",
 		description:
-			"Complex PIC with 3 spiral delay lines, MZIs, heaters, and electrical routing (786 lines)",
+			"Complex PIC with 3 spiral delay lines, MZIs, heaters, and electrical routing (794 lines)",
 		category: "photonics",
 		fileName: "default.py",
 		executionTimeSec: 3,
-		lineCount: 786,
+		lineCount: 794,
 	},
 	{
 		id: "pic-component-showcase",